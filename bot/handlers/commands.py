@@ -5,25 +5,22 @@ from aiogram.filters import Command
 
 from database import settings as db_settings
 from database import messages as db_messages
-from config.settings import DEFAULT_MODEL, DEFAULT_DURATION, DEFAULT_RESOLUTION
+from config.settings import DEFAULT_MODEL, DEFAULT_DURATION, DEFAULT_RESOLUTION, MODEL_PRICE_PER_SEC
 
 router = Router()
 
+# Supported options, ordered for display (only Veo 3.0 and 3.1 models)
+MODELS = tuple(MODEL_PRICE_PER_SEC)
+DURATIONS = (4, 6, 8)
+RESOLUTIONS = ("720p", "1080p")
 
-@router.message(Command("start"))
-async def cmd_start(message: Message):
-    """Handle /start command."""
-    await message.answer(
-        "👋 Welcome to the Video Generation Bot!\n\n"
-        "Send me a text prompt and I'll generate a video for you using Google Veo API.\n\n"
-        "Use /help to see all available commands."
-    )
-
+# Sets used for validation
+VALID_MODELS = frozenset(MODELS)
+VALID_DURATIONS = frozenset(DURATIONS)
+VALID_RESOLUTIONS = frozenset(RESOLUTIONS)
 
-@router.message(Command("help"))
-async def cmd_help(message: Message):
-    """Handle /help command."""
-    help_text = """
+# Static texts, built once at import
+HELP_TEXT = """
 📖 Available Commands:
 
 /start - Welcome message
@@ -40,13 +37,105 @@ Just send me a text prompt and I'll generate a video for you!
 
 Example: <code>A beautiful sunset over the ocean</code>
     """
-    await message.answer(help_text)
+
+_MODELS_USAGE_TEXT = (
+    "❌ Please specify a model.\n\n"
+    "Usage: /setmodel [model]\n\n"
+    "Example:\n"
+    f"<code>/setmodel {MODELS[0]}</code>\n\n"
+    "📋 Available models (Veo 3.0 and 3.1 only):\n\n"
+    "<b>Veo 3.1 models:</b>\n" +
+    "\n".join(
+        f"  • <code>{m}</code>" + (" (default)" if m == DEFAULT_MODEL else "") for m in MODELS if "veo-3.1" in m
+    ) + "\n\n"
+    "<b>Veo 3.0 models:</b>\n" +
+    "\n".join(
+        f"  • <code>{m}</code>" + (" (default)" if m == DEFAULT_MODEL else "") for m in MODELS if "veo-3.0" in m
+    ) + "\n\n"
+    "💡 Use /help to explore other commands."
+)
+_MODELS_LIST_TEXT = (
+    "📋 Please use one of the supported models (Veo 3.0 and 3.1 only):\n\n"
+    "<b>Veo 3.1 models:</b>\n" +
+    "\n".join(f"  • <code>{m}</code>" for m in MODELS if "veo-3.1" in m) + "\n\n"
+    "<b>Veo 3.0 models:</b>\n" +
+    "\n".join(f"  • <code>{m}</code>" for m in MODELS if "veo-3.0" in m) + "\n\n"
+    "💡 Use /help to explore other commands."
+)
+
+_DURATIONS_TEXT = "\n".join(f"  • <code>{d}</code> seconds" for d in DURATIONS)
+_MODEL_TYPES = ("Veo 3.0", "Veo 3.1", "Veo 3")
+_DURATION_USAGE_TEXT = {
+    model_type: (
+        "❌ Please specify a duration.\n\n"
+        "Usage: /setduration [seconds]\n\n"
+        "Example:\n"
+        "<code>/setduration 8</code>\n\n"
+        f"📋 Valid durations for {model_type} models:\n"
+        f"{_DURATIONS_TEXT}(default)\n\n"
+    )
+    for model_type in _MODEL_TYPES
+}
+_DURATION_NOT_A_NUMBER_TEXT = {
+    model_type: (
+        "❌ Invalid duration. Please provide a number.\n\n"
+        "Usage: /setduration [seconds]\n\n"
+        f"Valid durations for {model_type} models:\n"
+        f"{_DURATIONS_TEXT}\n\n"
+        "💡 Use /help to explore other commands."
+    )
+    for model_type in _MODEL_TYPES
+}
+_DURATION_LIST_TEXT = {
+    model_type: (
+        f"📋 Valid durations for {model_type} models:\n"
+        f"{_DURATIONS_TEXT}\n\n"
+    )
+    for model_type in _MODEL_TYPES
+}
+
+_RESOLUTION_USAGE_TEXT = (
+    "❌ Please specify a resolution.\n\n"
+    "Usage: /setresolution [resolution]\n\n"
+    "Example:\n"
+    "<code>/setresolution 1080p</code>\n\n"
+    "Valid resolutions:\n"
+    "- <code>720p</code> (default)\n"
+    "- <code>1080p</code>\n\n"
+    "💡 Use /help to explore other commands."
+)
+_RESOLUTIONS_LIST_TEXT = (
+    "Please use one of the supported resolutions:\n" +
+    "\n".join(f"- <code>{r}</code>" for r in RESOLUTIONS) + "\n\n"
+    "💡 Use /help to explore other commands."
+)
+
+
+def _model_type(model: str) -> str:
+    """Return the model family name used in messages."""
+    return "Veo 3.0" if "veo-3.0" in model else "Veo 3.1" if "veo-3.1" in model else "Veo 3"
+
+
+@router.message(Command("start"))
+async def cmd_start(message: Message):
+    """Handle /start command."""
+    await message.answer(
+        "👋 Welcome to the Video Generation Bot!\n\n"
+        "Send me a text prompt and I'll generate a video for you using Google Veo API.\n\n"
+        "Use /help to see all available commands."
+    )
+
+
+@router.message(Command("help"))
+async def cmd_help(message: Message):
+    """Handle /help command."""
+    await message.answer(HELP_TEXT)
 
 
 @router.message(Command("settings"))
 async def cmd_settings(message: Message):
     """Handle /settings command."""
-    user_settings = db_settings.get_user_settings(message.from_user.id)
+    user_settings = await db_settings.get_user_settings(message.from_user.id)
     
     settings_text = f"""
 ⚙️ Your Current Settings:
@@ -69,53 +158,18 @@ async def cmd_setmodel(message: Message):
     # Extract model from command arguments
     parts = message.text.split(maxsplit=1)
     if len(parts) < 2:
-        await message.answer(
-            "❌ Please specify a model.\n\n"
-            "Usage: /setmodel [model]\n\n"
-            "Example:\n"
-            "<code>/setmodel veo-3.1-generate-001</code>\n\n"
-            "📋 Available models (Veo 3.0 and 3.1 only):\n\n"
-            "<b>Veo 3.1 models:</b>\n"
-            "  • <code>veo-3.1-generate-001</code>\n"
-            "  • <code>veo-3.1-fast-generate-001</code> (default)\n"
-            "  • <code>veo-3.1-generate-preview</code>\n"
-            "  • <code>veo-3.1-fast-generate-preview</code>\n\n"
-            "<b>Veo 3.0 models:</b>\n"
-            "  • <code>veo-3.0-generate-001</code>\n"
-            "  • <code>veo-3.0-fast-generate-001</code>\n\n"
-            "💡 Use /help to explore other commands."
-        )
+        await message.answer(_MODELS_USAGE_TEXT)
         return
     
     model = parts[1].strip()
     
     # Validate model name (only veo 3 and 3.1 models are supported)
-    valid_models = [
-        "veo-3.1-generate-001",
-        "veo-3.1-fast-generate-001",
-        "veo-3.1-generate-preview",
-        "veo-3.1-fast-generate-preview",
-        "veo-3.0-generate-001",
-        "veo-3.0-fast-generate-001",
-    ]
-    
-    if model not in valid_models:
-        veo3_1_models = [m for m in valid_models if "veo-3.1" in m]
-        veo3_0_models = [m for m in valid_models if "veo-3.0" in m]
-        
-        await message.answer(
-            f"❌ Invalid model: <code>{model}</code>\n\n"
-            "📋 Please use one of the supported models (Veo 3.0 and 3.1 only):\n\n"
-            "<b>Veo 3.1 models:</b>\n" +
-            "\n".join(f"  • <code>{m}</code>" for m in veo3_1_models) + "\n\n"
-            "<b>Veo 3.0 models:</b>\n" +
-            "\n".join(f"  • <code>{m}</code>" for m in veo3_0_models) + "\n\n"
-            "💡 Use /help to explore other commands."
-        )
+    if model not in VALID_MODELS:
+        await message.answer(f"❌ Invalid model: <code>{model}</code>\n\n" + _MODELS_LIST_TEXT)
         return
     
     # Update settings
-    db_settings.set_user_settings(message.from_user.id, model=model)
+    await db_settings.set_user_settings(message.from_user.id, model=model)
     await message.answer(f"✅ Model set to: <code>{model}</code>")
 
 
@@ -123,29 +177,17 @@ async def cmd_setmodel(message: Message):
 async def cmd_setduration(message: Message):
     """Handle /setduration command."""
     # Get current user settings to show model-specific options
-    user_settings = db_settings.get_user_settings(message.from_user.id)
+    user_settings = await db_settings.get_user_settings(message.from_user.id)
     model = user_settings["model"]
     
     # Determine model type for clearer messaging
-    is_veo3_0 = "veo-3.0" in model
-    is_veo3_1 = "veo-3.1" in model
-    model_type = "Veo 3.0" if is_veo3_0 else "Veo 3.1" if is_veo3_1 else "Veo 3"
-    
-    # Valid durations for Veo 3 models (both 3.0 and 3.1)
-    valid_durations = [4, 6, 8]
+    model_type = _model_type(model)
     
     # Extract duration from command arguments
     parts = message.text.split(maxsplit=1)
     if len(parts) < 2:
         await message.answer(
-            f"❌ Please specify a duration.\n\n"
-            f"Usage: /setduration [seconds]\n\n"
-            f"Example:\n"
-            f"<code>/setduration 8</code>\n\n"
-            f"📋 Valid durations for {model_type} models:\n"
-            f"  • <code>4</code> seconds\n"
-            f"  • <code>6</code> seconds\n"
-            f"  • <code>8</code> seconds(default)\n\n"
+            _DURATION_USAGE_TEXT[model_type] +
             f"Your current model: <code>{model}</code>\n"
             f"Your current duration: <code>{user_settings['duration']}</code> seconds\n\n"
             f"💡 Use /help to explore other commands."
@@ -155,32 +197,21 @@ async def cmd_setduration(message: Message):
     try:
         duration = int(parts[1].strip())
     except ValueError:
-        await message.answer(
-            f"❌ Invalid duration. Please provide a number.\n\n"
-            f"Usage: /setduration [seconds]\n\n"
-            f"Valid durations for {model_type} models:\n"
-            f"  • <code>4</code> seconds\n"
-            f"  • <code>6</code> seconds\n"
-            f"  • <code>8</code> seconds\n\n"
-            f"💡 Use /help to explore other commands."
-        )
+        await message.answer(_DURATION_NOT_A_NUMBER_TEXT[model_type])
         return
     
     # Validate duration - Veo 3 models only support 4, 6, or 8
-    if duration not in valid_durations:
+    if duration not in VALID_DURATIONS:
         await message.answer(
-            f"❌ Invalid duration: <code>{duration}</code> seconds\n\n"
-            f"📋 Valid durations for {model_type} models:\n"
-            f"  • <code>4</code> seconds\n"
-            f"  • <code>6</code> seconds\n"
-            f"  • <code>8</code> seconds\n\n"
+            f"❌ Invalid duration: <code>{duration}</code> seconds\n\n" +
+            _DURATION_LIST_TEXT[model_type] +
             f"Your current model: <code>{model}</code>\n\n"
             f"💡 Use /help to explore other commands."
         )
         return
     
     # Update settings
-    db_settings.set_user_settings(message.from_user.id, duration=duration)
+    await db_settings.set_user_settings(message.from_user.id, duration=duration)
     await message.answer(
         f"✅ Duration set to: <code>{duration}</code> seconds\n\n"
         f"Model: <code>{model}</code>\n"
@@ -194,38 +225,22 @@ async def cmd_setresolution(message: Message):
     # Extract resolution from command arguments
     parts = message.text.split(maxsplit=1)
     if len(parts) < 2:
-        await message.answer(
-            "❌ Please specify a resolution.\n\n"
-            "Usage: /setresolution [resolution]\n\n"
-            "Example:\n"
-            "<code>/setresolution 1080p</code>\n\n"
-            "Valid resolutions:\n"
-            "- <code>720p</code> (default)\n"
-            "- <code>1080p</code>\n\n"
-            "💡 Use /help to explore other commands."
-        )
+        await message.answer(_RESOLUTION_USAGE_TEXT)
         return
     
     resolution = parts[1].strip().lower()
     
     # Validate resolution
-    valid_resolutions = ["720p", "1080p"]
-    
-    if resolution not in valid_resolutions:
-        await message.answer(
-            f"❌ Invalid resolution: <code>{resolution}</code>\n\n"
-            "Please use one of the supported resolutions:\n" +
-            "\n".join(f"- <code>{r}</code>" for r in valid_resolutions) + "\n\n"
-            "💡 Use /help to explore other commands."
-        )
+    if resolution not in VALID_RESOLUTIONS:
+        await message.answer(f"❌ Invalid resolution: <code>{resolution}</code>\n\n" + _RESOLUTIONS_LIST_TEXT)
         return
     
     # Check if resolution is supported by the current model
-    user_settings = db_settings.get_user_settings(message.from_user.id)
+    user_settings = await db_settings.get_user_settings(message.from_user.id)
     model = user_settings["model"]
     
     # Update settings first
-    db_settings.set_user_settings(message.from_user.id, resolution=resolution)
+    await db_settings.set_user_settings(message.from_user.id, resolution=resolution)
     
     # 1080p is only supported by Veo 3 models
     if resolution == "1080p" and "veo-3" not in model:
@@ -242,7 +257,7 @@ async def cmd_setresolution(message: Message):
 @router.message(Command("reset"))
 async def cmd_reset(message: Message):
     """Handle /reset command."""
-    db_settings.reset_user_settings(message.from_user.id)
+    await db_settings.reset_user_settings(message.from_user.id)
     await message.answer(
         f"✅ Settings reset to defaults:\n\n"
         f"Model: <code>{DEFAULT_MODEL}</code>\n"
@@ -254,7 +269,7 @@ async def cmd_reset(message: Message):
 @router.message(Command("stats"))
 async def cmd_stats(message: Message):
     """Handle /stats command."""
-    stats = db_messages.get_stats()
+    stats = await db_messages.get_stats()
     
     stats_text = f"""
 📊 Usage Statistics:
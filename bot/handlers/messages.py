@@ -1,46 +1,63 @@
 """Regular message handler for video generation."""
+import asyncio
 import logging
 import time
+from typing import Dict, Optional, Set
 from aiogram import Router, F
 from aiogram.types import Message, FSInputFile
 from aiogram.filters import Command
 from veo.client import VeoClient
+from veo.tracker import OperationTracker
 from database import settings as db_settings
 from database import messages as db_messages
 from storage.manager import StorageManager
-from config.settings import GLOBAL_VIDEO_QUOTA_LIMIT
+from bot.middlewares import UserThrottleMiddleware
+from config.settings import GLOBAL_VIDEO_QUOTA_LIMIT, MAX_CONCURRENT_GENERATIONS, MODEL_PRICE_PER_SEC, VEO_OUTPUT_STORAGE_URI
 
 router = Router()
+router.message.middleware(UserThrottleMiddleware())
 logger = logging.getLogger(__name__)
 
 # Initialize clients
 veo_client = VeoClient()
+operation_tracker = OperationTracker(veo_client)
 storage_manager = StorageManager()
 
+# Generations run as background tasks, bounded by a shared semaphore
+_generation_semaphore = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+_generation_tasks: Set[asyncio.Task] = set()
+# Generations holding a slot whose outcome is not recorded yet, counted against the quota
+_reserved_generations = 0
+
 
 def calculate_cost(model: str, duration_seconds: int) -> float:
-    """Calculate video generation cost based on model and duration.
-    
-    Pricing from PRICING.md:
-    - Standard models: $0.40 per second
-    - Fast models: $0.15 per second
-    """
-    # Determine if model is "fast" based on model name
-    is_fast = "fast" in model.lower()
-    
-    # Price per second in USD
-    price_per_second = 0.15 if is_fast else 0.40
-    
-    # Calculate total cost
-    cost = price_per_second * duration_seconds
-    return cost
+    """Calculate video generation cost based on model and duration."""
+    return MODEL_PRICE_PER_SEC[model] * duration_seconds
+
+
+def _quota_reached_text() -> Optional[str]:
+    """Return the message shown when the global video quota is used up, or None if it is not."""
+    videos_generated = db_messages.get_successful_videos_count()
+    if videos_generated + _reserved_generations < GLOBAL_VIDEO_QUOTA_LIMIT:
+        return None
+    total_cost = db_messages.get_total_cost()
+    remaining_quota = max(GLOBAL_VIDEO_QUOTA_LIMIT - videos_generated - _reserved_generations, 0)
+    return (
+        f"❌ <b>Quota Limit Reached</b>\n\n"
+        f"The global limit of <b>{GLOBAL_VIDEO_QUOTA_LIMIT} videos</b> has been reached.\n\n"
+        f"📊 Stats:\n"
+        f"  • Total videos generated: {videos_generated}\n"
+        f"  • Videos in progress: {_reserved_generations}\n"
+        f"  • Total cost: <b>${total_cost:.2f} USD</b>\n"
+        f"  • Remaining quota: {remaining_quota} videos\n\n"
+        f"The service is temporarily unavailable. Please try again later."
+    )
 
 
 @router.message(F.text & ~F.text.startswith("/"))
 async def handle_message(message: Message):
     """Handle regular messages as video generation prompts."""
     user_id = message.from_user.id
-    username = message.from_user.username or message.from_user.first_name or "Unknown"
     
     # Only process text messages
     if not message.text:
@@ -54,50 +71,86 @@ async def handle_message(message: Message):
         return
     
     # Check global video quota before proceeding
-    videos_generated = db_messages.get_successful_videos_count()
-    total_cost = db_messages.get_total_cost()
-    
-    if videos_generated >= GLOBAL_VIDEO_QUOTA_LIMIT:
-        remaining_quota = GLOBAL_VIDEO_QUOTA_LIMIT - videos_generated
-        await message.answer(
-            f"❌ <b>Quota Limit Reached</b>\n\n"
-            f"The global limit of <b>{GLOBAL_VIDEO_QUOTA_LIMIT} videos</b> has been reached.\n\n"
-            f"📊 Stats:\n"
-            f"  • Total videos generated: {videos_generated}\n"
-            f"  • Total cost: <b>${total_cost:.2f} USD</b>\n"
-            f"  • Remaining quota: {remaining_quota} videos\n\n"
-            f"The service is temporarily unavailable. Please try again later."
-        )
+    if quota_text := _quota_reached_text():
+        await message.answer(quota_text)
         return
     
     # Get user settings
-    user_settings = db_settings.get_user_settings(user_id)
-    
-    # Create message record
-    message_id = db_messages.create_message(
-        user_id=user_id,
-        username=username,
-        model=user_settings["model"],
-        duration_seconds=user_settings["duration"],
-        resolution=user_settings["resolution"],
-        status="pending"
-    )
+    user_settings = await db_settings.get_user_settings(user_id)
     
     # Send initial response
     status_msg = await message.answer("🎬 Video generation requeted...")
     
+    # Run generation in the background so the update is acknowledged right away
+    task = asyncio.create_task(_run_generation(message, status_msg, prompt, user_settings))
+    _generation_tasks.add(task)
+    task.add_done_callback(_generation_tasks.discard)
+    return task
+
+
+async def _record_message(message: Message, user_settings: Dict[str, any], status: str, cost: float = 0.0):
+    """Store the final outcome of a generation request.
+    
+    Failures are logged rather than raised, so a write error can never turn a
+    delivered video into a second, failed record.
+    """
+    try:
+        await db_messages.create_message(
+            user_id=message.from_user.id,
+            username=message.from_user.username or message.from_user.first_name or "Unknown",
+            model=user_settings["model"],
+            duration_seconds=user_settings["duration"],
+            resolution=user_settings["resolution"],
+            cost=cost,
+            status=status
+        )
+    except Exception as e:
+        logger.error(f"Failed to record {status} message: {e}", exc_info=True)
+
+
+async def _run_generation(
+    message: Message,
+    status_msg: Message,
+    prompt: str,
+    user_settings: Dict[str, any]
+):
+    """Generate, download and send a video, waiting for a free generation slot."""
+    global _reserved_generations
+    async with _generation_semaphore:
+        # Other generations may have used up the quota while this one was queued
+        if quota_text := _quota_reached_text():
+            await status_msg.edit_text(quota_text)
+            return
+        _reserved_generations += 1
+        try:
+            await _generate_and_send(message, status_msg, prompt, user_settings)
+        finally:
+            _reserved_generations -= 1
+
+
+async def _generate_and_send(
+    message: Message,
+    status_msg: Message,
+    prompt: str,
+    user_settings: Dict[str, any]
+):
+    """Generate a video for the prompt and send it to the user."""
     try:
         # Record start time for generation tracking
         start_time = time.time()
         
+        # Calculate cost before paying for the generation, so an unpriced model fails early
+        cost = calculate_cost(user_settings["model"], user_settings["duration"])
+        
         # Generate video
-        result = veo_client.generate_video(
+        result = await veo_client.generate_video(
             prompt=prompt,
             model=user_settings["model"],
             duration_seconds=user_settings["duration"],
             resolution=user_settings["resolution"],
             generate_audio=True,
-            sample_count=1
+            sample_count=1,
+            storage_uri=VEO_OUTPUT_STORAGE_URI
         )
         
         operation_name = result["operation_name"]
@@ -106,34 +159,25 @@ async def handle_message(message: Message):
         await status_msg.edit_text("⏳ Video generation started...")
         
         # Poll for completion
-        poll_result = veo_client.poll_operation(
+        poll_result = await operation_tracker.wait(
             operation_name=operation_name,
             model=user_settings["model"],
             max_wait_time=600  # 10 minutes max
         )
         
         if poll_result.get("error"):
-            db_messages.update_message(
-                message_id=message_id,
-                status="failed"
-            )
+            await _record_message(message, user_settings, status="failed")
             await status_msg.edit_text(f"❌ Video generation failed: {poll_result['error']}")
             return
         
         if not poll_result.get("done"):
-            db_messages.update_message(
-                message_id=message_id,
-                status="failed"
-            )
+            await _record_message(message, user_settings, status="failed")
             await status_msg.edit_text("❌ Video generation timed out. Please try again.")
             return
         
         videos = poll_result.get("videos", [])
         if not videos:
-            db_messages.update_message(
-                message_id=message_id,
-                status="failed"
-            )
+            await _record_message(message, user_settings, status="failed")
             await status_msg.edit_text("❌ No videos were generated.")
             return
         
@@ -146,25 +190,9 @@ async def handle_message(message: Message):
         else:
             time_str = f"{seconds}s"
         
-        # Calculate cost
-        cost = calculate_cost(user_settings["model"], user_settings["duration"])
-        
         # Get first video
         video_data = videos[0]
         
-        # Update status
-        await status_msg.edit_text("⬇️ Downloading video...")
-        
-        # Download video
-        video_bytes = veo_client.download_video(video_data)
-        
-        # Save to temporary file
-        temp_file = storage_manager.create_temp_file(suffix=".mp4")
-        temp_file.write_bytes(video_bytes)
-        
-        # Update status
-        await status_msg.edit_text("📤 Uploading video to Telegram...")
-        
         # Build detailed caption with generation info
         generate_audio = True  # Currently always True in the implementation
         caption_parts = [
@@ -187,38 +215,58 @@ async def handle_message(message: Message):
         caption_parts.extend([
             "",
             "💰 Cost:",
-            f"  • ${cost:.2f} USD ({user_settings['duration']}s × ${0.15 if 'fast' in user_settings['model'].lower() else 0.40}/s)"
+            f"  • ${cost:.2f} USD ({user_settings['duration']}s × ${MODEL_PRICE_PER_SEC[user_settings['model']]}/s)"
         ])
         
         caption = "\n".join(caption_parts)
         
-        # Send video to user
+        # Let Telegram fetch the video directly when it has a signed URL
+        sent = False
         try:
-            video_input = FSInputFile(str(temp_file))
-            await message.answer_video(
-                video=video_input,
-                caption=caption
-            )
-        finally:
-            # Cleanup
-            storage_manager.cleanup(temp_file)
-        
-        # Update message record as successful
-        db_messages.update_message(
-            message_id=message_id,
-            status="success",
-            cost=cost
-        )
+            if video_url := await asyncio.to_thread(veo_client.get_video_url, video_data):
+                await status_msg.edit_text("📤 Sending video...")
+                await message.answer_video(
+                    video=video_url,
+                    caption=caption
+                )
+                sent = True
+        except Exception as e:
+            logger.warning(f"Sending video by URL failed, uploading it instead: {e}")
+        
+        if not sent:
+            # Update status
+            await status_msg.edit_text("⬇️ Downloading video...")
+            
+            # Download video to temporary file
+            temp_file = storage_manager.create_temp_file(suffix=".mp4")
+            try:
+                await veo_client.download_video_to(video_data, temp_file)
+                
+                # Update status
+                await status_msg.edit_text("📤 Uploading video to Telegram...")
+                
+                # Send video to user
+                video_input = FSInputFile(str(temp_file))
+                await message.answer_video(
+                    video=video_input,
+                    caption=caption
+                )
+            finally:
+                # Cleanup
+                storage_manager.cleanup(temp_file)
         
-        # Delete status message
-        await status_msg.delete()
+        # Record successful message
+        await _record_message(message, user_settings, status="success", cost=cost)
+        
+        # Delete status message; the outcome is already recorded, so failures here are only logged
+        try:
+            await status_msg.delete()
+        except Exception as e:
+            logger.warning(f"Deleting status message failed: {e}")
         
     except Exception as e:
         logger.error(f"Error generating video: {e}", exc_info=True)
-        db_messages.update_message(
-            message_id=message_id,
-            status="failed"
-        )
+        await _record_message(message, user_settings, status="failed")
         error_msg = str(e) if e else "Unknown error"
         # Truncate error message to avoid Telegram parsing issues
         if len(error_msg) > 200:
@@ -1,12 +1,33 @@
 """Bot entry point."""
 import asyncio
+import contextlib
 import logging
+import signal
+from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
-from config.settings import TELEGRAM_BOT_TOKEN
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+from config.settings import (
+    TELEGRAM_BOT_TOKEN,
+    QUOTA_RECONCILE_INTERVAL,
+    POLLING_TIMEOUT,
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+)
 from bot.handlers import commands, messages
+from database import connection as db_connection
+from database import settings as db_settings
+from database import messages as db_messages
 
 # Configure logging
 logging.basicConfig(
@@ -16,6 +37,34 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """Receive updates through a Telegram webhook served by aiohttp."""
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    
+    await bot.set_webhook(f"{WEBHOOK_URL}{WEBHOOK_PATH}", secret_token=WEBHOOK_SECRET)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    logger.info(f"Listening for webhook updates on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    
+    # Return on SIGTERM/SIGINT so main() can flush writes and close its connections
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    signals = (signal.SIGTERM, signal.SIGINT)
+    for sig in signals:
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        for sig in signals:
+            with contextlib.suppress(NotImplementedError):
+                loop.remove_signal_handler(sig)
+        await runner.cleanup()
+
+
 async def main():
     """Main function to run the bot."""
     # Initialize bot and dispatcher
@@ -29,14 +78,37 @@ async def main():
     dp.include_router(commands.router)
     dp.include_router(messages.router)
     
-    # Start polling
+    # Open shared database connection
+    await db_connection.init_db()
+    await db_settings.create_table()
+    await db_messages.create_table()
+    await db_messages.reconcile()
+    reconciler = asyncio.create_task(db_messages.run_reconciler(QUOTA_RECONCILE_INTERVAL))
+    writer = asyncio.create_task(db_messages.run_writer())
+    
+    # Start receiving updates
     logger.info("Starting bot...")
-    await dp.start_polling(bot)
+    try:
+        if WEBHOOK_URL:
+            await run_webhook(bot, dp)
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(bot, polling_timeout=POLLING_TIMEOUT, handle_signals=True)
+    finally:
+        reconciler.cancel()
+        # Commit queued writes before the connection is closed
+        await db_messages.stop_writer()
+        await writer
+        await messages.veo_client.aclose()
+        await db_connection.close_db()
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if uvloop:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
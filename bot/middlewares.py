@@ -0,0 +1,42 @@
+"""Dispatcher middlewares."""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Set
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+
+
+class UserThrottleMiddleware(BaseMiddleware):
+    """Allow only one video generation in progress per user.
+    
+    The wrapped handler returns the asyncio task running the generation;
+    the user stays blocked until that task finishes.
+    """
+    
+    def __init__(self):
+        """Initialize middleware."""
+        self._active_users: Set[int] = set()
+    
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any]
+    ) -> Any:
+        """Reject the message if the user already has a generation running."""
+        user_id = event.from_user.id
+        if user_id in self._active_users:
+            await event.answer("⏳ You already have a generation in progress. Please wait for it to finish.")
+            return None
+        
+        self._active_users.add(user_id)
+        try:
+            result = await handler(event, data)
+        except Exception:
+            self._active_users.discard(user_id)
+            raise
+        
+        if isinstance(result, asyncio.Task):
+            result.add_done_callback(lambda _: self._active_users.discard(user_id))
+        else:
+            self._active_users.discard(user_id)
+        return result
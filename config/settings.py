@@ -10,14 +10,43 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 GOOGLE_CLOUD_PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT_ID")
 GOOGLE_APPLICATION_CREDENTIALS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 GOOGLE_CLOUD_LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION")
+# Optional gs:// bucket/prefix where Veo writes generated videos
+VEO_OUTPUT_STORAGE_URI = os.getenv("VEO_OUTPUT_STORAGE_URI")
+
+# Webhook mode (long polling is used when WEBHOOK_URL is not set)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+
+# SQLite database file; WAL keeps its -wal and -shm files in the same directory
+DATABASE_PATH = os.getenv("DATABASE_PATH", str(Path(__file__).resolve().parent.parent / "database.db"))
 
 # Default settings
 DEFAULT_MODEL = "veo-3.1-fast-generate-001"
 DEFAULT_DURATION = 8
 DEFAULT_RESOLUTION = "720p"
 
+# Supported models and their price per second in USD, ordered for display (see PRICING.md)
+MODEL_PRICE_PER_SEC = {
+    "veo-3.1-generate-001": 0.40,
+    "veo-3.1-fast-generate-001": 0.15,
+    "veo-3.1-generate-preview": 0.40,
+    "veo-3.1-fast-generate-preview": 0.15,
+    "veo-3.0-generate-001": 0.40,
+    "veo-3.0-fast-generate-001": 0.15,
+}
+
 # Global quota limits
 GLOBAL_VIDEO_QUOTA_LIMIT = 70
+QUOTA_RECONCILE_INTERVAL = 300  # seconds
+
+# Maximum number of video generations running at the same time
+MAX_CONCURRENT_GENERATIONS = 8
+
+# Long polling timeout for getUpdates, in seconds
+POLLING_TIMEOUT = 30
 
 # Validate required environment variables
 if not TELEGRAM_BOT_TOKEN:
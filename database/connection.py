@@ -0,0 +1,39 @@
+"""Shared aiosqlite connection."""
+import asyncio
+from typing import Optional
+import aiosqlite
+from config.settings import DATABASE_PATH
+
+# Use on-disk SQLite database
+db_path = DATABASE_PATH
+_conn: Optional[aiosqlite.Connection] = None
+# Held around every write transaction so commits and rollbacks never interleave
+transaction_lock = asyncio.Lock()
+
+
+async def init_db() -> aiosqlite.Connection:
+    """Open the shared connection. Must be called once before any query."""
+    global _conn
+    if _conn is None:
+        _conn = await aiosqlite.connect(db_path)
+        _conn.row_factory = aiosqlite.Row
+        await _conn.execute("PRAGMA journal_mode=WAL")
+        await _conn.execute("PRAGMA synchronous=NORMAL")
+        await _conn.execute("PRAGMA temp_store=MEMORY")
+        await _conn.execute("PRAGMA mmap_size=268435456")
+    return _conn
+
+
+def get_conn() -> aiosqlite.Connection:
+    """Return the shared connection."""
+    if _conn is None:
+        raise RuntimeError("Database not initialized, call init_db() first")
+    return _conn
+
+
+async def close_db():
+    """Close the shared connection."""
+    global _conn
+    if _conn is not None:
+        await _conn.close()
+        _conn = None
@@ -1,36 +1,153 @@
 """Track individual messages with details."""
-import sqlite3
-import os
+import asyncio
+import logging
 from datetime import datetime
-from typing import Optional, List, Dict
-from config.settings import DEFAULT_MODEL, DEFAULT_DURATION, DEFAULT_RESOLUTION
-
-# Use on-disk SQLite database
-db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database.db")
-conn = sqlite3.connect(db_path, check_same_thread=False)
-conn.row_factory = sqlite3.Row
-cursor = conn.cursor()
-
-# Create messages table
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS messages (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        username TEXT,
-        timestamp TEXT NOT NULL,
-        prompt_tokens INTEGER DEFAULT 0,
-        output_prompt_tokens INTEGER DEFAULT 0,
-        model TEXT NOT NULL,
-        cost REAL DEFAULT 0.0,
-        duration_seconds INTEGER NOT NULL,
-        resolution TEXT NOT NULL,
-        status TEXT NOT NULL
-    )
-""")
-conn.commit()
-
-
-def create_message(
+from typing import Optional, List, Dict, Tuple
+from database.connection import get_conn, transaction_lock
+
+logger = logging.getLogger(__name__)
+
+# SQL statements
+_SQL_INSERT_MESSAGE = """
+    INSERT INTO messages (
+        user_id, username, timestamp, prompt_tokens, output_prompt_tokens,
+        model, cost, duration_seconds, resolution, status
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_STATS = """
+    SELECT
+        COUNT(*) as total_messages,
+        COUNT(DISTINCT user_id) as unique_users,
+        COALESCE(SUM(cost), 0.0) as total_cost,
+        COALESCE(SUM(prompt_tokens), 0) as total_prompt_tokens,
+        COALESCE(SUM(output_prompt_tokens), 0) as total_output_prompt_tokens,
+        COALESCE(SUM(status = 'success'), 0) as successful_messages,
+        COALESCE(SUM(status = 'failed'), 0) as failed_messages
+    FROM messages
+"""
+_SQL_SUCCESS_TOTALS = "SELECT COUNT(*) as count, SUM(cost) as total FROM messages WHERE status = 'success'"
+
+# In-memory quota counters, loaded and corrected by reconcile()
+_success_count = 0
+_total_cost = 0.0
+_counters_lock = asyncio.Lock()
+
+# Writes are queued and committed in batches by run_writer(); None asks it to stop
+WRITE_BATCH_SIZE = 50
+WRITE_BATCH_TIMEOUT = 0.05  # seconds
+_write_queue: "asyncio.Queue[Optional[Tuple[str, tuple, Optional[float], asyncio.Future]]]" = asyncio.Queue()
+_writer_stopping = False
+
+
+async def create_table():
+    """Create messages table and its indexes."""
+    conn = get_conn()
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            username TEXT,
+            timestamp TEXT NOT NULL,
+            prompt_tokens INTEGER DEFAULT 0,
+            output_prompt_tokens INTEGER DEFAULT 0,
+            model TEXT NOT NULL,
+            cost REAL DEFAULT 0.0,
+            duration_seconds INTEGER NOT NULL,
+            resolution TEXT NOT NULL,
+            status TEXT NOT NULL
+        )
+    """)
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_status ON messages(status)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_user_id ON messages(user_id)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_status_cost ON messages(status, cost)")
+    await conn.commit()
+
+
+async def _enqueue_write(sql: str, params: tuple, success_cost: Optional[float] = None) -> int:
+    """Queue a write for the background writer and wait for it to be committed.
+
+    success_cost is added to the quota counters once the write commits.
+    Returns the new row ID for inserts.
+    """
+    if _writer_stopping:
+        raise RuntimeError("Database writer is shutting down")
+    future = asyncio.get_running_loop().create_future()
+    await _write_queue.put((sql, params, success_cost, future))
+    return await future
+
+
+async def _write_batch(batch: List[Tuple[str, tuple, Optional[float], asyncio.Future]]):
+    """Execute a batch of queued writes in a single transaction.
+
+    On failure every write in the batch fails with the error, which is then re-raised.
+    """
+    global _success_count, _total_cost
+    async with _counters_lock, transaction_lock:
+        row_ids = []
+        try:
+            conn = get_conn()
+            try:
+                for sql, params, _, _ in batch:
+                    async with conn.execute(sql, params) as cur:
+                        row_ids.append(cur.lastrowid)
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+
+        for (_, _, success_cost, future), row_id in zip(batch, row_ids):
+            if success_cost is not None:
+                _success_count += 1
+                _total_cost += success_cost
+            if not future.done():
+                future.set_result(row_id)
+
+
+async def run_writer():
+    """Drain the write queue, committing up to WRITE_BATCH_SIZE writes at once, until stop_writer() is called."""
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        item = await _write_queue.get()
+        if item is None:
+            break
+        batch = [item]
+        deadline = loop.time() + WRITE_BATCH_TIMEOUT
+        while len(batch) < WRITE_BATCH_SIZE:
+            try:
+                item = _write_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(_write_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+        try:
+            await _write_batch(batch)
+        except Exception as e:
+            # The batch's callers already got the error; keep serving later writes
+            logger.error(f"Failed to write {len(batch)} queued messages: {e}", exc_info=True)
+
+
+async def stop_writer():
+    """Refuse new writes and let run_writer() commit the queued ones and exit."""
+    global _writer_stopping
+    _writer_stopping = True
+    await _write_queue.put(None)
+
+
+async def create_message(
     user_id: int,
     username: Optional[str],
     model: str,
@@ -43,92 +160,42 @@ def create_message(
 ) -> int:
     """Create a new message record and return its ID."""
     timestamp = datetime.utcnow().isoformat()
-    cursor.execute("""
-        INSERT INTO messages (
-            user_id, username, timestamp, prompt_tokens, output_prompt_tokens,
-            model, cost, duration_seconds, resolution, status
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
+    return await _enqueue_write(_SQL_INSERT_MESSAGE, (
         user_id, username, timestamp, prompt_tokens, output_prompt_tokens,
         model, cost, duration_seconds, resolution, status
-    ))
-    conn.commit()
-    return cursor.lastrowid
-
-
-def update_message(
-    message_id: int,
-    prompt_tokens: Optional[int] = None,
-    output_prompt_tokens: Optional[int] = None,
-    cost: Optional[float] = None,
-    status: Optional[str] = None
-):
-    """Update message record."""
-    updates = []
-    values = []
-    
-    if prompt_tokens is not None:
-        updates.append("prompt_tokens = ?")
-        values.append(prompt_tokens)
-    if output_prompt_tokens is not None:
-        updates.append("output_prompt_tokens = ?")
-        values.append(output_prompt_tokens)
-    if cost is not None:
-        updates.append("cost = ?")
-        values.append(cost)
-    if status is not None:
-        updates.append("status = ?")
-        values.append(status)
-    
-    if updates:
-        values.append(message_id)
-        cursor.execute(
-            f"UPDATE messages SET {', '.join(updates)} WHERE id = ?",
-            values
-        )
-        conn.commit()
+    ), cost if status == "success" else None)
 
 
-def get_stats() -> Dict[str, any]:
+async def get_stats() -> Dict[str, any]:
     """Get aggregated statistics across all users."""
-    cursor.execute("""
-        SELECT 
-            COUNT(*) as total_messages,
-            COUNT(DISTINCT user_id) as unique_users,
-            SUM(cost) as total_cost,
-            SUM(prompt_tokens) as total_prompt_tokens,
-            SUM(output_prompt_tokens) as total_output_prompt_tokens,
-            SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END) as successful_messages,
-            SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed_messages
-        FROM messages
-    """)
-    row = cursor.fetchone()
-    
-    return {
-        "total_messages": row["total_messages"] or 0,
-        "unique_users": row["unique_users"] or 0,
-        "total_cost": row["total_cost"] or 0.0,
-        "total_prompt_tokens": row["total_prompt_tokens"] or 0,
-        "total_output_prompt_tokens": row["total_output_prompt_tokens"] or 0,
-        "successful_messages": row["successful_messages"] or 0,
-        "failed_messages": row["failed_messages"] or 0
-    }
+    async with get_conn().execute(_SQL_STATS) as cur:
+        row = await cur.fetchone()
+
+    return dict(row)
 
 
 def get_successful_videos_count() -> int:
     """Get total count of successfully generated videos across all users."""
-    cursor.execute("""
-        SELECT COUNT(*) as count FROM messages WHERE status = 'success'
-    """)
-    row = cursor.fetchone()
-    return row["count"] or 0
+    return _success_count
 
 
 def get_total_cost() -> float:
     """Get total cost of all successfully generated videos across all users."""
-    cursor.execute("""
-        SELECT SUM(cost) as total FROM messages WHERE status = 'success'
-    """)
-    row = cursor.fetchone()
-    return row["total"] or 0.0
+    return _total_cost
+
+
+async def reconcile():
+    """Reload the quota counters from the messages table."""
+    global _success_count, _total_cost
+    async with _counters_lock:
+        async with get_conn().execute(_SQL_SUCCESS_TOTALS) as cur:
+            row = await cur.fetchone()
+        _success_count = row["count"] or 0
+        _total_cost = row["total"] or 0.0
+
 
+async def run_reconciler(interval: int):
+    """Periodically reconcile the quota counters to correct any drift."""
+    while True:
+        await asyncio.sleep(interval)
+        await reconcile()
@@ -1,74 +1,100 @@
 """On-disk settings storage using SQLite."""
-import sqlite3
-import os
+from collections import OrderedDict
 from typing import Optional, Dict
 from config.settings import DEFAULT_MODEL, DEFAULT_DURATION, DEFAULT_RESOLUTION
+from database.connection import get_conn, transaction_lock
 
-# Use on-disk SQLite database
-db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database.db")
-conn = sqlite3.connect(db_path, check_same_thread=False)
-conn.row_factory = sqlite3.Row
-cursor = conn.cursor()
-
-# Create settings table
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS user_settings (
-        user_id INTEGER PRIMARY KEY,
-        model TEXT NOT NULL,
-        duration INTEGER NOT NULL,
-        resolution TEXT NOT NULL
-    )
-""")
-conn.commit()
-
-
-def get_user_settings(user_id: int) -> Dict[str, any]:
+# Statements are kept as constants so sqlite3's statement cache reuses their compiled form
+_SQL_GET_SETTINGS = "SELECT model, duration, resolution FROM user_settings WHERE user_id = ?"
+_SQL_SET_SETTINGS = """
+    INSERT OR REPLACE INTO user_settings (user_id, model, duration, resolution)
+    VALUES (?, ?, ?, ?)
+"""
+_SQL_RESET_SETTINGS = "DELETE FROM user_settings WHERE user_id = ?"
+
+# Process-local cache of user settings, evicted least-recently-used first
+SETTINGS_CACHE_SIZE = 10_000
+_settings_cache: "OrderedDict[int, Dict[str, any]]" = OrderedDict()
+
+
+def _cache_put(user_id: int, settings: Dict[str, any]):
+    """Store settings in the cache, evicting the oldest entry when full."""
+    _settings_cache[user_id] = settings
+    _settings_cache.move_to_end(user_id)
+    if len(_settings_cache) > SETTINGS_CACHE_SIZE:
+        _settings_cache.popitem(last=False)
+
+
+async def create_table():
+    """Create settings table."""
+    conn = get_conn()
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_settings (
+            user_id INTEGER PRIMARY KEY,
+            model TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            resolution TEXT NOT NULL
+        )
+    """)
+    await conn.commit()
+
+
+async def get_user_settings(user_id: int) -> Dict[str, any]:
     """Get user settings or return defaults."""
-    cursor.execute("SELECT * FROM user_settings WHERE user_id = ?", (user_id,))
-    row = cursor.fetchone()
-    
+    if (cached := _settings_cache.get(user_id)) is not None:
+        _settings_cache.move_to_end(user_id)
+        return dict(cached)
+
+    async with get_conn().execute(_SQL_GET_SETTINGS, (user_id,)) as cur:
+        row = await cur.fetchone()
+
     if row:
-        return {
-            "user_id": row["user_id"],
+        settings = {
+            "user_id": user_id,
             "model": row["model"],
             "duration": row["duration"],
             "resolution": row["resolution"]
         }
-    
-    # Return defaults if no settings found
-    return {
-        "user_id": user_id,
-        "model": DEFAULT_MODEL,
-        "duration": DEFAULT_DURATION,
-        "resolution": DEFAULT_RESOLUTION
-    }
-
-
-def set_user_settings(user_id: int, model: Optional[str] = None, 
-                     duration: Optional[int] = None, 
-                     resolution: Optional[str] = None) -> Dict[str, any]:
+    else:
+        # Return defaults if no settings found
+        settings = {
+            "user_id": user_id,
+            "model": DEFAULT_MODEL,
+            "duration": DEFAULT_DURATION,
+            "resolution": DEFAULT_RESOLUTION
+        }
+
+    _cache_put(user_id, settings)
+    return dict(settings)
+
+
+async def set_user_settings(user_id: int, model: Optional[str] = None,
+                            duration: Optional[int] = None,
+                            resolution: Optional[str] = None) -> Dict[str, any]:
     """Update user settings."""
-    current = get_user_settings(user_id)
-    
+    current = await get_user_settings(user_id)
+
     if model is not None:
         current["model"] = model
     if duration is not None:
         current["duration"] = duration
     if resolution is not None:
         current["resolution"] = resolution
-    
-    cursor.execute("""
-        INSERT OR REPLACE INTO user_settings (user_id, model, duration, resolution)
-        VALUES (?, ?, ?, ?)
-    """, (user_id, current["model"], current["duration"], current["resolution"]))
-    conn.commit()
-    
+
+    conn = get_conn()
+    async with transaction_lock:
+        await conn.execute(_SQL_SET_SETTINGS, (user_id, current["model"], current["duration"], current["resolution"]))
+        await conn.commit()
+    _cache_put(user_id, dict(current))
+
     return current
 
 
-def reset_user_settings(user_id: int) -> Dict[str, any]:
+async def reset_user_settings(user_id: int) -> Dict[str, any]:
     """Reset user settings to defaults."""
-    cursor.execute("DELETE FROM user_settings WHERE user_id = ?", (user_id,))
-    conn.commit()
-    return get_user_settings(user_id)
-
+    conn = get_conn()
+    async with transaction_lock:
+        await conn.execute(_SQL_RESET_SETTINGS, (user_id,))
+        await conn.commit()
+    _settings_cache.pop(user_id, None)
+    return await get_user_settings(user_id)
@@ -1,13 +1,66 @@
 """Veo API wrapper."""
-import time
-import base64
-from typing import Dict
-import requests
+import asyncio
+import contextlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import quote
+import httpx
+import orjson
 from google.auth import default
 from google.auth.transport.requests import Request
 
+try:
+    # SIMD-accelerated drop-in replacement for the stdlib module
+    import pybase64 as base64
+except ImportError:
+    import base64
+
 from config.settings import GOOGLE_CLOUD_PROJECT_ID, GOOGLE_CLOUD_LOCATION
 
+logger = logging.getLogger(__name__)
+
+# Refresh the access token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+# Refresh interval for credentials that do not report an expiry, in seconds
+TOKEN_REFRESH_INTERVAL = 45 * 60
+
+# Retry policy for transient API failures
+REQUEST_RETRIES = 5
+RETRY_BACKOFF = 0.5  # seconds, doubled after each attempt
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Statuses that guarantee the request was not acted on, safe to replay for non-idempotent calls
+UNPROCESSED_STATUSES = frozenset({429, 503})
+
+# Operation polling backoff used by OperationTracker, in seconds
+POLL_INITIAL_DELAY = 5.0
+POLL_DELAY_MULTIPLIER = 1.5
+POLL_MAX_DELAY = 45.0
+
+# GCS JSON API endpoint used to stream generated videos
+GCS_OBJECT_URL = "https://storage.googleapis.com/storage/v1/b/{bucket}/o/{blob}"
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Objects larger than one range are fetched as concurrent byte ranges
+DOWNLOAD_RANGE_SIZE = 16 * 1024 * 1024
+DOWNLOAD_CONCURRENCY = 8
+
+
+def iter_base64_decoded(data: str, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """Decode a base64 payload in windows yielding at most chunk_size bytes each."""
+    # Each 4 base64 characters decode to 3 bytes, so windows stay 4-aligned
+    window = chunk_size // 3 * 4
+    for start in range(0, len(data), window):
+        yield base64.b64decode(data[start:start + window])
+
+
+def _write_base64(data: str, path: Path):
+    """Decode a base64 payload into a file chunk by chunk."""
+    with open(path, "wb") as f:
+        for chunk in iter_base64_decoded(data):
+            f.write(chunk)
+
 
 class VeoClient:
     """Client for interacting with Google Veo API."""
@@ -17,27 +70,128 @@ class VeoClient:
         self.project_id = GOOGLE_CLOUD_PROJECT_ID
         self.location = GOOGLE_CLOUD_LOCATION
         self.credentials, _ = default(scopes=['https://www.googleapis.com/auth/cloud-platform'])
+        self._auth_request = Request()
+        self._refresh_lock = asyncio.Lock()
+        self._auth_token: Optional[str] = None
+        self._token_refresher: Optional[asyncio.Task] = None
+        self._storage_client = None
+        self._storage_client_lock = threading.Lock()
         self.base_url = f"https://{self.location}-aiplatform.googleapis.com/v1"
+        self._model_prefix = f"{self.base_url}/projects/{self.project_id}/locations/{self.location}/publishers/google/models"
+        self._model_urls: Dict[Tuple[str, str], str] = {}
+        # Shared HTTP/2 client so connections are reused across requests
+        self._http = httpx.AsyncClient(
+            http2=True,
+            headers={"Content-Type": "application/json"},
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+        # HTTP/2 would multiplex every range over one connection, so ranges use HTTP/1.1
+        self._download_http = httpx.AsyncClient(
+            http2=False,
+            timeout=60.0
+        )
+    
+    def _get_storage_client(self):
+        """Return the shared Cloud Storage client, creating it on first use."""
+        if self._storage_client is None:
+            with self._storage_client_lock:
+                if self._storage_client is None:
+                    from google.cloud import storage
+                    # Reuse our credentials and project to skip another ADC lookup
+                    self._storage_client = storage.Client(project=self.project_id, credentials=self.credentials)
+        return self._storage_client
+    
+    async def aclose(self):
+        """Stop the token refresher and close the underlying HTTP client."""
+        if self._token_refresher is not None:
+            self._token_refresher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._token_refresher
+        await self._http.aclose()
+        await self._download_http.aclose()
+    
+    async def _refresh_token(self):
+        """Fetch a new access token."""
+        async with self._refresh_lock:
+            await asyncio.to_thread(self.credentials.refresh, self._auth_request)
     
-    def _request(self, endpoint: str, body: Dict) -> Dict:
-        """Make authenticated API request."""
-        self.credentials.refresh(Request())
-        url = f"{self.base_url}/{endpoint}"
-        response = requests.post(url, json=body, headers={"Authorization": f"Bearer {self.credentials.token}"})
+    async def _run_token_refresher(self):
+        """Keep the access token warm by refreshing it shortly before it expires."""
+        while True:
+            expiry = self.credentials.expiry
+            if expiry:
+                delay = (expiry - datetime.utcnow()).total_seconds() - TOKEN_REFRESH_MARGIN
+            else:
+                delay = TOKEN_REFRESH_INTERVAL
+            await asyncio.sleep(max(delay, 0))
+            try:
+                await self._refresh_token()
+            except Exception as e:
+                logger.warning(f"Background token refresh failed: {e}")
+                await asyncio.sleep(30)
+    
+    async def _ensure_token(self):
+        """Refresh the access token only when it is missing or close to expiry."""
+        if not self.credentials.valid:
+            async with self._refresh_lock:
+                if not self.credentials.valid:
+                    await asyncio.to_thread(self.credentials.refresh, self._auth_request)
+        if self._token_refresher is None or self._token_refresher.done():
+            self._token_refresher = asyncio.create_task(self._run_token_refresher())
+        # Set the Authorization header once per token instead of on every request
+        if self._auth_token != self.credentials.token:
+            self._auth_token = self.credentials.token
+            self._http.headers["Authorization"] = f"Bearer {self._auth_token}"
+            self._download_http.headers["Authorization"] = f"Bearer {self._auth_token}"
+    
+    def _model_url(self, model: str, method: str) -> str:
+        """Return the full URL of a model method, building it once per model."""
+        if (url := self._model_urls.get((model, method))) is None:
+            url = self._model_urls[(model, method)] = f"{self._model_prefix}/{model}:{method}"
+        return url
+    
+    async def _request(self, url: str, body: Dict, idempotent: bool = True) -> Dict:
+        """Make authenticated API request, retrying transient failures with backoff.
+        
+        Non-idempotent requests are only retried when the server cannot have
+        acted on them: connection failures and UNPROCESSED_STATUSES responses.
+        """
+        await self._ensure_token()
+        content = orjson.dumps(body)
+        retry_errors = httpx.TransportError if idempotent else httpx.ConnectError
+        retry_statuses = RETRY_STATUSES if idempotent else UNPROCESSED_STATUSES
+        for attempt in range(REQUEST_RETRIES):
+            last_attempt = attempt == REQUEST_RETRIES - 1
+            try:
+                response = await self._http.post(url, content=content)
+            except retry_errors as e:
+                if last_attempt:
+                    raise
+                logger.warning(f"Request to {url} failed, retrying: {e}")
+            else:
+                if response.status_code not in retry_statuses or last_attempt:
+                    break
+                logger.warning(f"Request to {url} returned {response.status_code}, retrying")
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
     
-    def generate_video(
+    async def generate_video(
         self,
         prompt: str,
         model: str,
         duration_seconds: int = 8,
         resolution: str = "720p",
         generate_audio: bool = True,
-        sample_count: int = 1
+        sample_count: int = 1,
+        storage_uri: Optional[str] = None
     ) -> Dict:
-        """Generate video using Veo API."""
-        endpoint = f"projects/{self.project_id}/locations/{self.location}/publishers/google/models/{model}:predictLongRunning"
+        """Generate video using Veo API.
+        
+        When storage_uri (a gs:// bucket or prefix) is set, Veo writes the video
+        there and returns its gcsUri instead of inline base64 bytes.
+        """
         body = {
             "instances": [{"prompt": prompt}],
             "parameters": {
@@ -47,40 +201,72 @@ class VeoClient:
                 "sampleCount": sample_count
             }
         }
-        result = self._request(endpoint, body)
+        if storage_uri:
+            body["parameters"]["storageUri"] = storage_uri
+        # Starting a generation is billed, so only replay it when it surely did not start
+        result = await self._request(self._model_url(model, "predictLongRunning"), body, idempotent=False)
         if not (operation_name := result.get("name")):
             raise ValueError(f"Failed to get operation name: {result}")
         return {"operation_name": operation_name, "model": model}
     
-    def poll_operation(self, operation_name: str, model: str, max_wait_time: int = 600) -> Dict:
-        """Poll for operation completion."""
-        endpoint = f"projects/{self.project_id}/locations/{self.location}/publishers/google/models/{model}:fetchPredictOperation"
-        start_time = time.time()
-        while time.time() - start_time < max_wait_time:
-            try:
-                result = self._request(endpoint, {"operationName": operation_name})
-                if result.get("done", False):
-                    if "error" in result:
-                        return {"done": True, "error": str(result["error"]), "videos": []}
-                    response_data = result.get("response", {})
-                    return {
-                        "done": True,
-                        "videos": response_data.get("videos", []),
-                        "raiMediaFilteredCount": response_data.get("raiMediaFilteredCount", 0),
-                        "error": None
-                    }
-                time.sleep(5)
-            except Exception as e:
-                return {"done": True, "error": f"API request failed: {str(e)}", "videos": []}
-        return {"done": False, "error": "Operation timed out", "videos": []}
+    async def fetch_operation(self, operation_name: str, model: str) -> Dict:
+        """Fetch the current state of an operation."""
+        result = await self._request(self._model_url(model, "fetchPredictOperation"), {"operationName": operation_name})
+        if not result.get("done", False):
+            return {"done": False, "error": None, "videos": []}
+        if "error" in result:
+            return {"done": True, "error": str(result["error"]), "videos": []}
+        response_data = result.get("response", {})
+        return {
+            "done": True,
+            "videos": response_data.get("videos", []),
+            "raiMediaFilteredCount": response_data.get("raiMediaFilteredCount", 0),
+            "error": None
+        }
     
-    def download_video(self, video_data: Dict) -> bytes:
-        """Download video from GCS URI or decode from base64."""
+    def get_video_url(self, video_data: Dict, expiration: timedelta = timedelta(minutes=15)) -> Optional[str]:
+        """Return a signed HTTPS URL for a video stored in GCS, or None for inline videos."""
+        if "gcsUri" not in video_data:
+            return None
+        bucket_name, blob_path = video_data["gcsUri"].replace("gs://", "").split("/", 1)
+        blob = self._get_storage_client().bucket(bucket_name).blob(blob_path)
+        return blob.generate_signed_url(version="v4", expiration=expiration, method="GET")
+    
+    async def download_video_to(self, video_data: Dict, path: Path):
+        """Download video from GCS URI or decode from base64 straight into a file."""
         if "gcsUri" in video_data:
-            from google.cloud import storage
+            await self._ensure_token()
             bucket_name, blob_path = video_data["gcsUri"].replace("gs://", "").split("/", 1)
-            return storage.Client().bucket(bucket_name).blob(blob_path).download_as_bytes()
+            url = GCS_OBJECT_URL.format(bucket=bucket_name, blob=quote(blob_path, safe=""))
+            semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+            
+            # The first range also reports the object size, so small videos take one request
+            with open(path, "wb"):
+                pass
+            size = await self._download_range(url, path, 0, DOWNLOAD_RANGE_SIZE, semaphore)
+            await asyncio.gather(*(
+                self._download_range(url, path, start, min(start + DOWNLOAD_RANGE_SIZE, size), semaphore)
+                for start in range(DOWNLOAD_RANGE_SIZE, size, DOWNLOAD_RANGE_SIZE)
+            ))
         elif "bytesBase64Encoded" in video_data:
-            return base64.b64decode(video_data["bytesBase64Encoded"])
-        raise ValueError("Video data must contain either 'gcsUri' or 'bytesBase64Encoded'")
-
+            await asyncio.to_thread(_write_base64, video_data["bytesBase64Encoded"], path)
+        else:
+            raise ValueError("Video data must contain either 'gcsUri' or 'bytesBase64Encoded'")
+    
+    async def _download_range(self, url: str, path: Path, start: int, end: int, semaphore: asyncio.Semaphore) -> int:
+        """Stream bytes [start, end) of a GCS object into the same offset of a file.
+        
+        Returns the total size of the object.
+        """
+        async with semaphore:
+            headers = {"Range": f"bytes={start}-{end - 1}"}
+            async with self._download_http.stream("GET", url, params={"alt": "media"}, headers=headers) as response:
+                response.raise_for_status()
+                # A 200 carries the whole object, which must not be written at this offset
+                if response.status_code != 206:
+                    raise ValueError(f"Expected a partial response for bytes {start}-{end - 1}, got {response.status_code}")
+                with open(path, "r+b") as f:
+                    f.seek(start)
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                return int(response.headers["Content-Range"].rsplit("/", 1)[1])
@@ -0,0 +1,98 @@
+"""Shared polling of in-flight Veo operations."""
+import asyncio
+from typing import Dict, Optional
+
+from veo.client import VeoClient, POLL_INITIAL_DELAY, POLL_DELAY_MULTIPLIER, POLL_MAX_DELAY
+
+
+def _as_error(exc: BaseException) -> Exception:
+    """Return exc as an Exception that waiters can handle, wrapping cancellation."""
+    if isinstance(exc, Exception):
+        return exc
+    return RuntimeError(f"Operation polling stopped: {exc!r}")
+
+
+class _PendingOperation:
+    """An operation waiting for completion and its polling schedule."""
+    
+    def __init__(self, model: str, future: asyncio.Future, next_poll: float):
+        """Initialize pending operation."""
+        self.model = model
+        self.future = future
+        self.delay = POLL_INITIAL_DELAY
+        self.next_poll = next_poll
+
+
+class OperationTracker:
+    """Polls every in-flight operation from one background task.
+    
+    Each operation is polled with its own exponential backoff; operations
+    that are due at the same time are fetched concurrently.
+    """
+    
+    def __init__(self, client: VeoClient):
+        """Initialize operation tracker."""
+        self.client = client
+        self._pending: Dict[str, _PendingOperation] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def wait(self, operation_name: str, model: str, max_wait_time: int = 600) -> Dict:
+        """Wait for an operation to complete.
+        
+        Returns the final VeoClient.fetch_operation result, or a not-done result
+        with an error once max_wait_time is exceeded.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[operation_name] = _PendingOperation(model, future, loop.time() + POLL_INITIAL_DELAY)
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        try:
+            return await asyncio.wait_for(future, max_wait_time)
+        except asyncio.TimeoutError:
+            return {"done": False, "error": "Operation timed out", "videos": []}
+        finally:
+            self._pending.pop(operation_name, None)
+    
+    async def _run(self):
+        """Fetch due operations until none are left, failing every waiter if polling breaks."""
+        try:
+            await self._poll()
+        except BaseException as e:
+            error = _as_error(e)
+            for op in self._pending.values():
+                if not op.future.done():
+                    op.future.set_exception(error)
+            raise
+    
+    async def _poll(self):
+        """Fetch due operations until none are left."""
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            # Sleep until the next operation is due, or until a new one is added
+            self._wakeup.clear()
+            next_poll = min(op.next_poll for op in self._pending.values())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0.0, next_poll - loop.time()))
+                continue
+            except asyncio.TimeoutError:
+                pass
+            
+            now = loop.time()
+            due = [(name, op) for name, op in self._pending.items() if op.next_poll <= now]
+            results = await asyncio.gather(
+                *(self.client.fetch_operation(name, op.model) for name, op in due),
+                return_exceptions=True
+            )
+            for (_, op), result in zip(due, results):
+                if op.future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    op.future.set_exception(_as_error(result))
+                elif result["done"]:
+                    op.future.set_result(result)
+                else:
+                    op.delay = min(op.delay * POLL_DELAY_MULTIPLIER, POLL_MAX_DELAY)
+                    op.next_poll = loop.time() + op.delay